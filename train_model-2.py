@@ -1,9 +1,6 @@
 # trainmodel.py
 import pandas as pd
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import OneHotEncoder
-from sklearn.compose import ColumnTransformer
-from sklearn.pipeline import Pipeline
 from xgboost import XGBRegressor
 from sklearn.metrics import mean_absolute_error
 import joblib
@@ -18,22 +15,26 @@ def train_and_save_model(data_path):
     X = df.drop("Task_Completion_Time_min", axis=1)
     y = df["Task_Completion_Time_min"]
 
-    # Categorical and numerical features
+    # Categorical features — handled natively by XGBoost (enable_categorical)
+    # instead of one-hot encoding, so the feature matrix stays narrow and no
+    # encoder has to run again at inference time.
     cat_features = ["Terrain", "Task_Type"]
-
-    # Custom preprocessing pipeline WITHOUT prefixes
-    # Added handle_unknown='ignore' to handle unknown categories
-    preprocessor = ColumnTransformer(
-        transformers=[
-            ("cat", OneHotEncoder(drop="first", handle_unknown="ignore"), cat_features)
-        ],
-        remainder="passthrough",
-        verbose_feature_names_out=False,  # This removes the prefixes!
-    )
-
-    # Full pipeline with model
-    pipeline = Pipeline(
-        steps=[("preprocessor", preprocessor), ("model", XGBRegressor(random_state=42))]
+    for col in cat_features:
+        X[col] = X[col].astype("category")
+
+    # Remember the fitted category dtypes so the server can rebuild frames
+    # with the exact same categories (unknown values become NaN = missing).
+    category_dtypes = {col: X[col].dtype for col in cat_features}
+
+    # Histogram split finding on all cores, with early stopping to prune
+    # estimators that stop helping on a held-out fold
+    model = XGBRegressor(
+        n_estimators=500,
+        tree_method="hist",
+        enable_categorical=True,
+        n_jobs=-1,
+        early_stopping_rounds=20,
+        random_state=42,
     )
 
     # Train/test split
@@ -41,33 +42,46 @@ def train_and_save_model(data_path):
         X, y, test_size=0.2, random_state=42
     )
 
-    # Fit pipeline
-    pipeline.fit(X_train, y_train)
+    # Carve a validation fold out of the training data for early stopping
+    X_fit, X_valid, y_fit, y_valid = train_test_split(
+        X_train, y_train, test_size=0.2, random_state=42
+    )
+
+    # Fit model
+    model.fit(X_fit, y_fit, eval_set=[(X_valid, y_valid)], verbose=False)
 
     # Predict and evaluate
-    preds = pipeline.predict(X_test)
+    preds = model.predict(X_test)
     mae = mean_absolute_error(y_test, preds)
     print("Mean Absolute Error:", mae)
 
-    # Save the pipeline as a single .pkl file
-    joblib.dump(pipeline, "task_time_prediction.pkl")
-    print("Pipeline with model saved as task_time_prediction.pkl")
+    # Save the booster in XGBoost's native UBJSON format — loads in
+    # milliseconds at serve-time and stays compatible across XGB versions,
+    # unlike unpickling the sklearn wrapper
+    booster = model.get_booster()
+    booster.save_model("task_time_prediction.ubj")
+    print("Booster saved as task_time_prediction.ubj")
+
+    # Category dtypes go in their own pkl so the server can rebuild request
+    # frames with the exact training categories
+    joblib.dump(category_dtypes, "task_time_categories.pkl")
+    print("Category dtypes saved as task_time_categories.pkl")
 
     # Optionally save feature names separately if needed elsewhere
-    feature_names = pipeline.named_steps["preprocessor"].get_feature_names_out()
+    feature_names = list(X.columns)
     joblib.dump(feature_names, "task_time_features.pkl")
     print("Feature names saved as task_time_features.pkl")
 
-    print("Feature names after preprocessing:", feature_names)
+    print("Feature names:", feature_names)
 
     # Check what terrain and task types are available in the training data
     print("\nAvailable categories in training data:")
     print("Terrain types:", sorted(df["Terrain"].unique()))
     print("Task types:", sorted(df["Task_Type"].unique()))
 
-    # Test the pipeline with sample data
+    # Test the model with sample data
     print("\n" + "=" * 50)
-    print("Testing the trained pipeline:")
+    print("Testing the trained model:")
 
     # Create a sample test case with KNOWN categories
     sample_data = pd.DataFrame(
@@ -86,16 +100,13 @@ def train_and_save_model(data_path):
             "Task_Type": ["Loading"],  # Using a known task type
         }
     )
+    for col, dtype in category_dtypes.items():
+        sample_data[col] = sample_data[col].astype(dtype)
 
     # Test prediction
-    test_prediction = pipeline.predict(sample_data)
+    test_prediction = model.predict(sample_data)
     print(f"Sample prediction: {test_prediction[0]:.2f} minutes")
 
-    # Show what the preprocessor outputs
-    processed_sample = pipeline.named_steps["preprocessor"].transform(sample_data)
-    print(f"Processed sample shape: {processed_sample.shape}")
-    print(f"Feature names: {list(feature_names)}")
-
     # Test with unknown category to show it handles it gracefully
     print("\n" + "=" * 30)
     print("Testing with unknown category:")
@@ -116,15 +127,17 @@ def train_and_save_model(data_path):
             "Task_Type": ["Excavation"],  # Unknown task type
         }
     )
+    for col, dtype in category_dtypes.items():
+        unknown_sample[col] = unknown_sample[col].astype(dtype)
 
-    unknown_prediction = pipeline.predict(unknown_sample)
+    unknown_prediction = model.predict(unknown_sample)
     print(f"Prediction with unknown categories: {unknown_prediction[0]:.2f} minutes")
-    print("Note: Unknown categories are treated as all zeros in one-hot encoding")
+    print("Note: Unknown categories become NaN and are routed as missing values")
 
-    return pipeline
+    return model
 
 
 if __name__ == "__main__":
-    pipeline = train_and_save_model(
+    model = train_and_save_model(
         "task_time_dataset.csv"
     )  # Replace with your CSV filename